@@ -70,9 +70,8 @@ document.getElementById('extractForm').addEventListener('submit', async function
     let fileInfos = [];
     for (let file of files) {
         const arrayBuf = await file.arrayBuffer();
-        const uint8 = new Uint8Array(arrayBuf);
-        const dataArray = Array.from(uint8);
-        fileInfos.push({name: file.name, data: dataArray});
+        // Typed array crosses into Python as a buffer instead of a list of ints
+        fileInfos.push({name: file.name, data: new Uint8Array(arrayBuf)});
     }
 
     try {
@@ -99,8 +98,7 @@ document.getElementById('extractForm').addEventListener('submit', async function
 
                 displayMessage(result.message, result.type || 'success');
                 if (result.buffer) {
-                    const js_buffer = new Uint8Array(result.buffer);
-                    const blob = new Blob([js_buffer], {type: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"});
+                    const blob = new Blob([result.buffer], {type: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"});
                     const url = URL.createObjectURL(blob);
                     const a = document.createElement("a");
                     a.href = url;
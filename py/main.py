@@ -1,13 +1,22 @@
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.worksheet.table import Table, TableStyleInfo
+import numpy as np
+from openpyxl import Workbook, load_workbook
+from openpyxl.worksheet.table import Table, TableStyleInfo, TableColumn
+from openpyxl.worksheet.filters import AutoFilter
 import io
+import warnings
 from datetime import datetime
 from pyscript import ffi, window, document
 import re
+import xlrd
 from collections import defaultdict
+from operator import itemgetter
+from itertools import islice, chain
+from functools import lru_cache
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ERROR_CODES
 
 # Section: Configuration Class
 # Holds all configurable settings for columns, formats, and processing rules
@@ -40,18 +49,18 @@ class ColumnConfig:
             'Kurs',
             'Total (USD)'
         ]
-        self.preserve_upper_customer = {  # Words to keep uppercase for customers
+        self.preserve_upper_customer = frozenset({  # Words to keep uppercase for customers
             'ABC',
             'BAL',
             'TSG'
-        }
-        self.preserve_upper_product = {  # Words to keep uppercase for products
+        })
+        self.preserve_upper_product = frozenset({  # Words to keep uppercase for products
             'GMS',
             'HVP',
             'WCI',
             'BBQ',
             'KAN'
-        }
+        })
         self.area_replacements = {  # Area abbreviations to full names
             'Bdg': 'Bandung',
             'Bgr': 'Bogor',
@@ -71,132 +80,171 @@ def col_to_index(col):
     # Converts column letter to zero-based index
     return ord(col.upper()) - ord('A')
 
-def proper_case(text, preserve_upper=set()):
-    if not text:
-        return ''
-    # Split into alphanum words and non-alphanum separators
-    parts = re.findall(r'[a-zA-Z0-9]+|[^a-zA-Z0-9]+', str(text).strip())
-    processed_parts = []
-    for part in parts:
-        if re.match(r'^[a-zA-Z0-9]+$', part):  # word
-            # Split into letter and digit subparts
-            subparts = re.findall(r'[a-zA-Z]+|[0-9]+', part)
-            processed_sub = []
-            for sub in subparts:
-                if sub.isdigit():
-                    processed_sub.append(sub)
-                else:  # letters
-                    upper_sub = sub.upper()
-                    if upper_sub in preserve_upper:
-                        processed_sub.append(upper_sub)
-                    elif len(sub) <= 2:
-                        processed_sub.append(sub)  # preserve case
-                    else:
-                        processed_sub.append(sub.capitalize())
-            processed_parts.append(''.join(processed_sub))
-        else:  # separator
-            processed_parts.append(part)
-    return ''.join(processed_parts)
+_LETTER_RUN = re.compile(r'[a-zA-Z]+')
+
+@lru_cache(maxsize=None)
+def preserve_pattern(preserve_upper):
+    # Compiles a frozenset of uppercase words into one case-insensitive alternation, once per set
+    return re.compile('|'.join(map(re.escape, sorted(preserve_upper))) or r'(?!)', re.IGNORECASE)
+
+def proper_case(values, preserve_upper=frozenset()):
+    # Cases every letter run of a text column in one vectorized pass; digits and separators pass through
+    preserve_re = preserve_pattern(frozenset(preserve_upper))
+    def case_word(match):
+        word = match.group(0)
+        if preserve_re.fullmatch(word):
+            return word.upper()
+        if len(word) <= 2:
+            return word  # preserve case
+        return word.capitalize()
+    text = values.astype(str).str.strip().str.replace(_LETTER_RUN, case_word, regex=True)
+    return text.where(values.astype(bool), '')
+
+def process_area(values, replacements):
+    # Keeps the first word of each area, cases it and expands abbreviations
+    first_word = values.astype(str).str.split().str[0]
+    return proper_case(first_word.where(values.astype(bool), '')).replace(replacements)
+
+def map_unique(values, transform):
+    # Applies a column transform to the distinct values only, then maps the results back onto every row
+    unique_values = values.unique()
+    return values.map(dict(zip(unique_values, transform(pd.Series(unique_values, dtype=object)))))
+
+# Section: Workbook Loading
+# Parses each input file once into plain row tuples
+def to_frame_value(value):
+    # Mirrors pd.read_excel cell conversion: errors become blank, whole floats become ints
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in ERROR_CODES:
+        return None
+    return value
 
-def process_area(area, replacements):
-    # Processes area string with replacements and casing
-    if not area:
-        return ''
-    area = proper_case(area.strip().split()[0])
-    return replacements.get(area, area)
+def xls_value(cell, datemode):
+    # Converts an xlrd cell to the value openpyxl would return for it
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    return to_frame_value(cell.value)
+
+def open_sheet(buffer, filename, width):
+    # Streams the first sheet's rows once so validation and extraction share the parse; rows are padded/cut to width.
+    # The workbook is released when the stream is exhausted or closed early
+    if filename.endswith('.xls'):
+        book = xlrd.open_workbook(file_contents=buffer.getvalue(), on_demand=True)  # Only the first sheet gets parsed
+        try:
+            sheet = book.sheet_by_index(0)
+            for r in range(sheet.nrows):
+                row = tuple(xls_value(cell, book.datemode) for cell in sheet.row_slice(r, 0, width))
+                yield row + (None,) * (width - len(row))
+        finally:
+            book.release_resources()
+        return
+    wb = load_workbook(buffer, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()  # Some exporters write a wrong <dimension> tag, which would cut the rows short
+        for row in ws.iter_rows(max_col=width, values_only=True):
+            yield tuple(to_frame_value(v) for v in row)
+    finally:
+        wb.close()
+
+def is_blank(value):
+    # Treats missing and whitespace-only cells as blank
+    return value is None or str(value).strip() == ''
 
 # Section: Structure Validation
 # Validates input file structure for blanks in validation column
-def validate_structure(buffer, filename, config):
-    # Checks if specified validation cells are blank
-    engine = 'xlrd' if filename.endswith('.xls') else 'openpyxl'
-    df = pd.read_excel(buffer, header=None, engine=engine)
+def validate_structure(rows, config):
+    # Checks if specified validation cells (rows 4-6) are blank
     validation_idx = col_to_index(config.validation_column)
-    if validation_idx >= df.shape[1]:
-        return True  # Column doesn't exist, treat as valid
-    cells = [df.iloc[3, validation_idx], df.iloc[4, validation_idx], df.iloc[5, validation_idx]]
-    return all(pd.isna(cell) or str(cell).strip() == '' for cell in cells)
-
-# Section: Date Validation
-# Validates extracted dates are proper datetime
-def validate_dates(data):
-    # Checks if all dates in extracted data are valid datetime
-    for row in data:
-        date_val = row.get('date')
-        if date_val and not isinstance(date_val, datetime):
-            # Try force convert if str or num
-            try:
-                if isinstance(date_val, (str, int, float)):
-                    pd.to_datetime(date_val)
-                else:
-                    return False
-            except:
-                return False
-    return True
+    cells = [row[validation_idx] for row in rows[3:6]]
+    return all(is_blank(cell) for cell in cells)
 
 # Section: Data Extraction
 # Extracts relevant data from input file
-def extract_data(buffer, filename, config):
-    # Reads and extracts data rows based on config, handling date conversion
-    engine = 'xlrd' if filename.endswith('.xls') else 'openpyxl'
-    df = pd.read_excel(buffer, header=None, engine=engine, skiprows=3)
+def parse_numbers(values):
+    # Converts a column to floats, blanking anything non-numeric
+    return pd.to_numeric(values, errors='coerce').astype(float)
+
+def parse_dates(values):
+    # Converts a column to timestamps; unparseable cells become NaT
+    return pd.to_datetime(values, errors='coerce', format='mixed')
+
+def parse_invoices(values):
+    # Forces invoice numbers to strings; whole float cells lose their .0, everything else keeps its digits
+    is_whole = values.map(lambda v: isinstance(v, float) and v.is_integer())
+    text = values.astype(str)
+    text[is_whole] = values[is_whole].map(lambda v: str(int(v)))
+    return text.where(values.notna())
+
+COLUMN_PARSERS = {  # Column-wise conversions applied by extract_data, keyed by source column
+    'C': parse_dates,
+    'D': parse_invoices,
+    'H': parse_numbers,
+    'I': parse_numbers
+}
+
+def extract_data(rows, config):
+    # Extracts data rows (row 4 onwards) from an iterable of sheet rows, handling date conversion;
+    # returns None if a filled date cell is not a valid date
+    pick = itemgetter(*[col_to_index(col) for col in config.extract_columns])
     main_idx = col_to_index(config.main_column)
-    extract_idxs = [col_to_index(col) for col in config.extract_columns]
-    data = []
-    for _, row in df.iterrows():
-        if pd.isna(row[main_idx]) or str(row[main_idx]).strip() == '':
-            continue
-        row_data = {}
-        for i, col in enumerate(config.extract_columns):
-            val = row[extract_idxs[i]]
-            if pd.isna(val):
-                val = ''
-            elif col == 'H':
-                try:
-                    val = float(val)
-                except:
-                    val = ''
-            elif col == 'I':
-                try:
-                    val = float(val)
-                except:
-                    val = ''
-            elif col == 'C':
-                if isinstance(val, (str, int, float)):
-                    try:
-                        val = pd.to_datetime(val)
-                    except:
-                        val = val  # Keep original if fail, validate later
-            elif col == 'D':
-                val = str(val).rstrip('.0') if isinstance(val, float) else str(val)  # Force str, remove .0
-            row_data[config.key_map[col]] = val
-        data.append(row_data)
-    return data
+    # Keep only the extract columns of rows with data, then build the frame once
+    records = [pick(row) for row in islice(rows, 3, None) if not is_blank(row[main_idx])]
+    df = pd.DataFrame(records, columns=config.extract_columns)
+    # Coerce whole columns at once instead of per cell
+    raw_dates = df['C']
+    for col, parse in COLUMN_PARSERS.items():
+        df[col] = parse(df[col])
+    if (df['C'].isna() & raw_dates.notna() & (raw_dates.astype(str) != '')).any():
+        return None
+    # Parsed dates and numbers keep their dtypes (NaT/NaN for blanks) so later steps need no second parse
+    text_cols = [col for col in config.extract_columns if col not in ('C', 'H', 'I')]
+    df[text_cols] = df[text_cols].astype(object).where(df[text_cols].notna(), '')
+    df.columns = [config.key_map[col] for col in config.extract_columns]
+    return df
+
+# Section: File Processing
+# Handles one uploaded file end to end, independent of the others
+def process_file(name, data, config):
+    # Returns (frame, None) on success, or (None, 'structure' / 'date') when the file is rejected
+    sheet_width = max(col_to_index(col) for col in config.extract_columns + [config.validation_column]) + 1
+    rows = open_sheet(io.BytesIO(data), name, sheet_width)  # data is bytes-like (memoryview from JS)
+    head = list(islice(rows, 6))  # Enough to validate; the rest is only read if the file passes
+    if not validate_structure(head, config):
+        rows.close()
+        return None, 'structure'
+    frame = extract_data(chain(head, rows), config)
+    if frame is None:
+        return None, 'date'
+    return frame, None
 
 # Section: Data Processing
 # Normalizes and processes extracted data
 def process_data(combined_data, config):
-    # Applies normalization and collects unique periods
-    periods = set()
-    for row in combined_data:
-        row['area'] = process_area(row['area'], config.area_replacements)
-        row['customer_name'] = proper_case(row['customer_name'], config.preserve_upper_customer)
-        row['product_name'] = proper_case(row['product_name'], config.preserve_upper_product)
-        date_value = row.get('date')
-        if date_value and isinstance(date_value, datetime):
-            periods.add(date_value.strftime('%Y-%m'))
-        row['invoice_no'] = str(row['invoice_no']) if row.get('invoice_no') else ''
-        row['product_type'] = str(row['product_type']) if row.get('product_type') else ''
-        row['quantity'] = row['quantity'] if row.get('quantity') else ''
-        row['unit_price'] = row['unit_price'] if row.get('unit_price') else ''
-    combined_data = sorted(combined_data, key=lambda x: x.get('date') or datetime.min)
-    return sorted(list(periods)), combined_data
+    # Applies normalization column-wise and collects unique periods
+    combined_data['area'] = map_unique(combined_data['area'], lambda v: process_area(v, config.area_replacements))
+    combined_data['customer_name'] = map_unique(combined_data['customer_name'], lambda v: proper_case(v, config.preserve_upper_customer))
+    combined_data['product_name'] = map_unique(combined_data['product_name'], lambda v: proper_case(v, config.preserve_upper_product))
+    for key in ['invoice_no', 'product_type']:
+        combined_data[key] = combined_data[key].astype(str).where(combined_data[key].astype(bool), '')
+    for key in ['quantity', 'unit_price']:
+        combined_data[key] = combined_data[key].where(combined_data[key] != 0)  # Zero counts as blank
+    periods = combined_data['date'].dropna().dt.strftime('%Y-%m').unique()
+    # Precomputed so the Sales Data sheet only needs formulas where inputs are missing
+    combined_data['period'] = combined_data['date'].dt.to_period('M').dt.to_timestamp()
+    combined_data['total_idr'] = combined_data['quantity'] * combined_data['unit_price']
+    combined_data = combined_data.sort_values('date', kind='stable', na_position='first', ignore_index=True)
+    return sorted(periods), combined_data
 
 # Section: Blank Check
 # Checks for blank required fields
 def check_blanks(combined_data):
     # Identifies blank cells in required fields
-    warnings = []
     key_to_col = {
         'area': 'A',
         'date': 'B',
@@ -207,57 +255,135 @@ def check_blanks(combined_data):
         'quantity': 'H',
         'unit_price': 'I'
     }
-    required_keys = list(key_to_col.keys())
-    for i, row in enumerate(combined_data, 1):
-        for key in required_keys:
-            if not row.get(key):
-                warnings.append(f"{key_to_col[key]}{i+1}")
-    return warnings
+    required = combined_data[list(key_to_col.keys())]
+    mask = (required.isna() | (required.astype(object) == '')).to_numpy()
+    col_letters = list(key_to_col.values())
+    rows, cols = np.nonzero(mask)  # Row-major, matching row-then-key order
+    return [f"{col_letters[c]}{r+2}" for r, c in zip(rows, cols)]
 
 # Section: Table Generation
-# General function to generate Excel table from 2D data
-def generate_table(sheet, headers, data_2d, table_name, col_formats=None, row_formulas=None, start_row=1, start_col=1):
-    # Writes headers and data to sheet, applies formats/formulas, creates table
-    for rel_c, header in enumerate(headers, 1):
-        c = start_col + rel_c - 1
-        sheet.cell(start_row, c).value = header
-    for r_idx, row_data in enumerate(data_2d, 0):
-        r = start_row + r_idx + 1
-        for rel_c, val in enumerate(row_data, 1):
-            c = start_col + rel_c - 1
-            sheet.cell(r, c).value = val
-            if col_formats and rel_c in col_formats:
-                sheet.cell(r, c).number_format = col_formats[rel_c]
-        if row_formulas and row_formulas.get(r_idx):
-            for rel_col, formula in row_formulas[r_idx].items():
-                c = start_col + rel_col - 1
-                sheet.cell(r, c).value = formula
-                if col_formats and rel_col in col_formats:
-                    sheet.cell(r, c).number_format = col_formats[rel_col]
+# General functions to build Excel tables from 2D data as streamed rows
+TABLE_STYLE = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)  # Shared by every table
+BOLD = Font(bold=True)
+
+def table_rows(sheet, headers, data_2d, col_formats=None, row_formulas=None):
+    # Builds header and data rows, merging formulas and wrapping formatted values in write-only cells
+    rows = [list(headers)]
+    # Loop-invariant lookups bound to locals for the per-cell loop
+    format_items = [(rel_c - 1, number_format) for rel_c, number_format in col_formats.items()] if col_formats else []
+    formulas_for = row_formulas.get if row_formulas else {}.get
+    make_cell = WriteOnlyCell
+    append = rows.append
+    for r_idx, row_data in enumerate(data_2d):
+        row_values = list(row_data)
+        formulas = formulas_for(r_idx)
+        if formulas:
+            for rel_col, formula in formulas.items():
+                row_values[rel_col - 1] = formula
+        for c_idx, number_format in format_items:
+            cell = make_cell(sheet, value=row_values[c_idx])
+            cell.number_format = number_format
+            row_values[c_idx] = cell
+        append(row_values)
+    return rows
+
+def total_row(sheet, n_cols, end_row, col_formats=None, start_col=1):
+    # Builds a bold 'Total' row summing each value column of a table whose data ends at end_row
+    label = WriteOnlyCell(sheet, value='Total')
+    label.font = BOLD
+    row = [label]
+    for rel_c in range(2, n_cols + 1):
+        letter = get_column_letter(start_col + rel_c - 1)
+        cell = WriteOnlyCell(sheet, value=f'=SUM({letter}2:{letter}{end_row})')
+        if col_formats and rel_c in col_formats:
+            cell.number_format = col_formats[rel_c]
+        cell.font = BOLD
+        row.append(cell)
+    return row
+
+def add_table(sheet, table_name, headers, n_rows, start_col=1):
+    # Registers a styled Excel table over the header row plus n_rows data rows starting at start_col
     last_col = start_col + len(headers) - 1
-    last_row = start_row + len(data_2d)
-    ref = f"{get_column_letter(start_col)}{start_row}:{get_column_letter(last_col)}{last_row}"
+    ref = f"{get_column_letter(start_col)}1:{get_column_letter(last_col)}{1 + n_rows}"
     tab = Table(displayName=table_name, ref=ref)
-    style = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-    tab.tableStyleInfo = style
-    sheet.add_table(tab)
+    # Write-only sheets cannot read the header cells back, so the columns are declared here
+    tab.tableColumns = [TableColumn(id=i, name=str(header)) for i, header in enumerate(headers, 1)]
+    tab.autoFilter = AutoFilter(ref=ref)
+    tab.tableStyleInfo = TABLE_STYLE
+    # add_table rejects names already used in the workbook; its write-only reminder about
+    # table columns is silenced because they are declared above
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='In write-only mode you must add table columns manually')
+        sheet.add_table(tab)
+
+def generate_table(sheet, headers, data_2d, table_name, col_formats=None, row_formulas=None):
+    # Streams headers and data to a new sheet, applies formats/formulas, creates table
+    for row in table_rows(sheet, headers, data_2d, col_formats, row_formulas):
+        sheet.append(row)
+    add_table(sheet, table_name, headers, len(data_2d))
+
+# Section: Period Layout
+# Lays out the month/quarter/year/grand periods shared by the group sheet columns and the Summary rows
+def build_period_structure(sorted_periods):
+    # Returns one entry per period in sheet order; 'sum_positions' are the 1-based positions (group sheet
+    # column = Summary row) of the months a quarter/year/grand total adds up
+    months_by_year = defaultdict(list)
+    for p in sorted_periods:
+        months_by_year[p[:4]].append(int(p[5:]))
+    period_columns = []
+    all_month_positions = []
+    for year, months_present in months_by_year.items():
+        year_month_positions = []
+        for q in range(1, 5):
+            q_months = [m for m in months_present if (m - 1) // 3 + 1 == q]
+            if not q_months:
+                continue
+            q_positions = []
+            for m in q_months:
+                q_positions.append(len(period_columns) + 2)
+                period_columns.append({
+                    'label': datetime(int(year), m, 1).strftime('%b %Y'),
+                    'type': 'month',
+                    'periods': [f'{year}-{m:02d}'],
+                    'date_str': f'DATE({int(year)},{m},1)',  # Periode criterion for SUMIF(S)
+                    'sum_positions': []
+                })
+            period_columns.append({
+                'label': f'Q{q} {year}',
+                'type': 'quarter',
+                'periods': [f'{year}-{m:02d}' for m in q_months],
+                'sum_positions': q_positions
+            })
+            year_month_positions += q_positions
+        period_columns.append({
+            'label': f'Total {year}',
+            'type': 'year',
+            'periods': [f'{year}-{m:02d}' for m in months_present],
+            'sum_positions': year_month_positions
+        })
+        all_month_positions += year_month_positions
+    if sorted_periods:
+        period_columns.append({
+            'label': 'Total',
+            'type': 'grand',
+            'periods': sorted_periods,
+            'sum_positions': all_month_positions
+        })
+    for position, pc in enumerate(period_columns, 2):
+        pc['col_letter'] = get_column_letter(position)  # Column on the group sheets
+        if pc['sum_positions']:
+            # Group sheet total formula with only the row left to fill in
+            pc['sum_template'] = '=SUM(' + ','.join(f'{get_column_letter(pos)}{{r}}' for pos in pc['sum_positions']) + ')'
+    return period_columns
 
 # Section: Group Sheet Generation
 # General function to generate group-based sheets (Customer/Area - IDR/USD/Qty)
 def generate_group_sheet(wb, group_key, unit, combined_data, period_columns, config):
     sort_unit = 'IDR' if unit == 'USD' else unit
-    group_to_total = defaultdict(float)
-    for row in combined_data:
-        q = row['quantity']
-        if not isinstance(q, (float, int)):
-            continue
-        if sort_unit == 'Qty':
-            group_to_total[row[group_key]] += q
-        else:
-            u = row['unit_price']
-            if isinstance(u, (float, int)):
-                group_to_total[row[group_key]] += q * u
-    groups = sorted(group_to_total.keys(), key=lambda g: -group_to_total[g])
+    # Rows missing the sort value are left out, so groups without any stay off the sheet
+    amounts = (combined_data['quantity'] if sort_unit == 'Qty' else combined_data['total_idr']).dropna()
+    group_to_total = amounts.groupby(combined_data[group_key], sort=False).sum()
+    groups = group_to_total.sort_values(ascending=False, kind='stable').index.tolist()  # Ties keep first-seen order
     if group_key == 'customer_name':
         sheet_name = f'Customer - {unit}'
         header_label = 'Customer'
@@ -287,59 +413,54 @@ def generate_group_sheet(wb, group_key, unit, combined_data, period_columns, con
     elif unit == 'Qty':
         for col in range(2, len(headers)+1):
             col_formats[col] = '#,##0'
+    # IDR and Qty month cells are written as values; USD depends on the rates typed into Exchange Rate
+    month_totals = {}
+    open_keys = set()
+    open_groups = set()
+    if unit != 'USD':
+        values = combined_data['total_idr' if unit == 'IDR' else 'quantity']
+        group_values = combined_data[group_key]
+        periods = combined_data['period'].dt.strftime('%Y-%m').fillna('')  # '' = no date yet
+        month_totals = values.groupby([group_values, periods]).sum().to_dict()
+        # Rows with a blank the user is asked to fill can still change a month total once filled in:
+        # a blank value changes its own cell, a blank date any month of its group, a blank group any group
+        open_rows = values.isna() | (periods == '') | (group_values == '')
+        open_keys = set(zip(group_values[open_rows], periods[open_rows]))
+        # SUMIFS matches case-insensitively and reads * ? ~ and leading = < > as patterns, so groups it
+        # would match differently from the exact groupby keep their formulas
+        names = pd.Series(group_values.unique(), dtype=object)
+        pattern_like = names.str.contains(r'[*?~]') | names.str.match(r'[=<>]')
+        open_groups = set(names[names.str.casefold().duplicated(keep=False) | pattern_like])
+    sum_col = {'IDR': 'Total (IDR)', 'USD': 'Total (USD)', 'Qty': 'Jumlah'}[unit]
+    sumifs_template = f'=SUMIFS(Sales_Data[{sum_col}], Sales_Data[{group_col}], $A{{r}}, Sales_Data[Periode], {{date_str}})'
     row_formulas = {}
-    for r_idx in range(len(groups)):
+    for r_idx, group in enumerate(groups):
         row_formulas[r_idx] = {}
         r = r_idx + 2
-        for pc_idx, pc in enumerate(period_columns):
-            c = pc_idx + 2
+        for c, pc in enumerate(period_columns, 2):
             if pc['type'] == 'month':
                 per = pc['periods'][0]
-                y, m = map(int, per.split('-'))
-                date_str = f'DATE({y},{m},1)'
-                if unit == 'IDR':
-                    sum_col = 'Total (IDR)'
-                elif unit == 'USD':
-                    sum_col = 'Total (USD)'
-                elif unit == 'Qty':
-                    sum_col = 'Jumlah'
-                formula = f'=SUMIFS(Sales_Data[{sum_col}], Sales_Data[{group_col}], $A{r}, Sales_Data[Periode], {date_str})'
+                if unit != 'USD' and group not in open_groups and open_keys.isdisjoint([(group, per), (group, ''), ('', per), ('', '')]):
+                    data_2d[r_idx][c - 1] = month_totals.get((group, per), 0)
+                    continue
+                formula = sumifs_template.format(r=r, date_str=pc['date_str'])
             else:
-                sum_cols = pc['sum_month_cols']
-                sum_str = ','.join(f'{sc}{r}' for sc in sum_cols)
-                formula = f'=SUM({sum_str})'
+                formula = pc['sum_template'].format(r=r)
             row_formulas[r_idx][c] = formula
     generate_table(sheet, headers, data_2d, table_name, col_formats, row_formulas)
-    end_row = 1 + len(data_2d)
-    total_row = end_row + 2
-    sheet.cell(total_row, 1).value = 'Total'
-    sheet.cell(total_row, 1).font = Font(bold=True)
-    for rel_c in range(2, len(headers)+1):
-        c = 1 + rel_c - 1
-        sum_formula = f'=SUM({get_column_letter(c)}2:{get_column_letter(c)}{end_row})'
-        sheet.cell(total_row, c).value = sum_formula
-        if col_formats and rel_c in col_formats:
-            sheet.cell(total_row, c).number_format = col_formats[rel_c]
-        sheet.cell(total_row, c).font = Font(bold=True)
+    sheet.append([])
+    sheet.append(total_row(sheet, len(headers), 1 + len(data_2d), col_formats))
 
 def compute_yearly_sort_totals(combined_data, group_key, unit):
     sort_unit = 'IDR' if unit == 'USD' else unit
-    yearly_totals = defaultdict(lambda: defaultdict(float))  # year -> group -> total
-    for row in combined_data:
-        date = row.get('date')
-        if not isinstance(date, datetime):
-            continue
-        year = str(date.year)
-        group = row[group_key]
-        q = row['quantity']
-        if not isinstance(q, (int, float)):
-            continue
-        if sort_unit == 'Qty':
-            yearly_totals[year][group] += q
-        else:  # IDR or USD (using IDR)
-            u = row['unit_price']
-            if isinstance(u, (int, float)):
-                yearly_totals[year][group] += q * u
+    values = combined_data['quantity'] if sort_unit == 'Qty' else combined_data['total_idr']  # USD sorts by IDR
+    # Rows without a date or sort value are left out, so years without any get no table
+    valid = values.notna() & combined_data['date'].notna()
+    years = combined_data.loc[valid, 'date'].dt.year.astype(str)
+    totals = values[valid].groupby([years, combined_data.loc[valid, group_key]]).sum()
+    yearly_totals = defaultdict(dict)  # year -> group -> total
+    for (year, group), total in totals.items():
+        yearly_totals[year][group] = total
     return yearly_totals
 
 def generate_yearly_group_sheet(wb, group_key, unit, combined_data, period_columns, config, year_to_col_letter):
@@ -360,7 +481,7 @@ def generate_yearly_group_sheet(wb, group_key, unit, combined_data, period_colum
         orig_sheet = f'Product - {unit}'
     sheet = wb.create_sheet(sheet_name)
     yearly_totals = compute_yearly_sort_totals(combined_data, group_key, unit)
-    all_groups = sorted(set(row[group_key] for row in combined_data if row[group_key]))
+    all_groups = sorted(set(g for g in combined_data[group_key] if g))
     col_formats = {1: '@'}
     if unit == 'IDR':
         col_formats[2] = config.idr_format_2
@@ -368,10 +489,13 @@ def generate_yearly_group_sheet(wb, group_key, unit, combined_data, period_colum
         col_formats[2] = config.usd_format_2
     elif unit == 'Qty':
         col_formats[2] = '#,##0'
+    # Yearly tables sit side by side, so their rows are collected and streamed together
+    blocks = []
     current_start_col = 1
     for year in sorted(yearly_totals.keys()):
-        year_totals = yearly_totals[year]
-        groups = sorted(all_groups, key=lambda g: -year_totals.get(g, 0))
+        # Every group is listed each year; ties (including groups without sales that year) stay alphabetical
+        year_totals = pd.Series(yearly_totals[year], dtype=float).reindex(all_groups, fill_value=0)
+        groups = year_totals.sort_values(ascending=False, kind='stable').index.tolist()
         headers = [header_label, f'Total {year}']
         data_2d = [[g, ''] for g in groups]
         table_name = f'{table_base}_{year}'
@@ -381,19 +505,15 @@ def generate_yearly_group_sheet(wb, group_key, unit, combined_data, period_colum
             r = r_idx + 2
             formula = f"=INDEX('{orig_sheet}'!{year_to_col_letter[year]}:{year_to_col_letter[year]}, MATCH({get_column_letter(current_start_col)}{r}, '{orig_sheet}'!A:A, 0))"
             row_formulas[r_idx][2] = formula
-        generate_table(sheet, headers, data_2d, table_name, col_formats, row_formulas, start_col=current_start_col)
-        end_row = 1 + len(data_2d)
-        total_row = end_row + 2
-        sheet.cell(total_row, current_start_col).value = 'Total'
-        sheet.cell(total_row, current_start_col).font = Font(bold=True)
-        for rel_c in range(2, len(headers)+1):
-            c = current_start_col + rel_c - 1
-            sum_formula = f'=SUM({get_column_letter(c)}2:{get_column_letter(c)}{end_row})'
-            sheet.cell(total_row, c).value = sum_formula
-            if col_formats and rel_c in col_formats:
-                sheet.cell(total_row, c).number_format = col_formats[rel_c]
-            sheet.cell(total_row, c).font = Font(bold=True)
+        rows = table_rows(sheet, headers, data_2d, col_formats, row_formulas)
+        rows.append([None] * len(headers))
+        rows.append(total_row(sheet, len(headers), 1 + len(data_2d), col_formats, start_col=current_start_col))
+        add_table(sheet, table_name, headers, len(data_2d), start_col=current_start_col)
+        blocks.append(rows)
         current_start_col += 3
+    # Every year lists all groups, so the blocks line up row for row; strict catches any that don't
+    for parts in zip(*blocks, strict=True):
+        sheet.append([value for part in parts for value in part + [None]])
 
 # Section: Main Processing Function
 # Orchestrates file processing and output
@@ -408,19 +528,16 @@ def process_files(file_datas):
     config = ColumnConfig()
     invalid_files = []  # Structure issues
     invalid_date_files = []  # Date format issues
-    combined_data = []
+    frames = []
     for f in file_datas:
         name = f['name']
-        buffer = io.BytesIO(bytes(f['data']))
-        if not validate_structure(buffer, name, config):
+        data, error = process_file(name, f['data'], config)
+        if error == 'structure':
             invalid_files.append(name)
-            continue
-        buffer.seek(0)
-        data = extract_data(buffer, name, config)
-        if not validate_dates(data):
+        elif error == 'date':
             invalid_date_files.append(name)
-            continue
-        combined_data.extend(data)
+        else:
+            frames.append(data)
     msg = ''
     if invalid_files:
         msg += '<p>These files do not follow the required format:</p><ul>' + ''.join(f'<li>{f}</li>' for f in invalid_files) + '</ul>'
@@ -431,14 +548,12 @@ def process_files(file_datas):
     if msg:
         message_div.innerHTML = msg
         return {'message': msg, 'type': 'error'}
+    combined_data = pd.concat(frames, ignore_index=True)
     sorted_periods, combined_data = process_data(combined_data, config)
     blank_cells = check_blanks(combined_data)
-    wb = Workbook()
-    sheet1 = wb.active
-    sheet1.title = 'Sales Data'
+    wb = Workbook(write_only=True)
+    sheet1 = wb.create_sheet('Sales Data')
     # Build 2D data for sales
-    sales_data_2d = []
-    sales_row_formulas = {}
     sales_col_formats = {
         1: '@',
         2: 'dd/mm/yyyy',
@@ -453,148 +568,55 @@ def process_files(file_datas):
         11: config.idr_format_0,
         12: config.usd_format_2
     }
-    for i, row in enumerate(combined_data):
-        date_value = row.get('date') if isinstance(row.get('date'), datetime) else ''
-        sales_data_2d.append([row['area'], date_value, '', row['invoice_no'], row['customer_name'], row['product_type'], row['product_name'], row['quantity'], row['unit_price'], '', '', ''])
-        sales_row_formulas[i] = {
-            3: f'=DATE(YEAR(B{i+2}), MONTH(B{i+2}), 1)',
-            10: f'=PRODUCT(H{i+2},I{i+2})',
-            11: f'=VLOOKUP(TEXT(C{i+2}, "YYYY-MM"), \'Exchange Rate\'!A:B, 2, FALSE)',
-            12: f'=J{i+2}/K{i+2}'
-        }
-    generate_table(sheet1, config.output_headers, sales_data_2d, "Sales_Data", sales_col_formats, sales_row_formulas)
+    # Formula columns are assembled as whole string columns from the sheet row numbers;
+    # period and total are plain values unless a blank input still has to be filled in
+    sales_cols = combined_data[['area', 'date', 'period', 'invoice_no', 'customer_name', 'product_type', 'product_name', 'quantity', 'unit_price', 'total_idr']]
+    sales_cols = sales_cols.astype(object).where(sales_cols.notna(), '')
+    r = pd.Series(np.arange(2, len(sales_cols) + 2), index=sales_cols.index).astype(str)
+    sales_table = pd.DataFrame({
+        'area': sales_cols['area'],
+        'date': sales_cols['date'],
+        'period': sales_cols['period'].where(combined_data['period'].notna(), '=DATE(YEAR(B' + r + '), MONTH(B' + r + '), 1)'),
+        'invoice_no': sales_cols['invoice_no'],
+        'customer_name': sales_cols['customer_name'],
+        'product_type': sales_cols['product_type'],
+        'product_name': sales_cols['product_name'],
+        'quantity': sales_cols['quantity'],
+        'unit_price': sales_cols['unit_price'],
+        'total_idr': sales_cols['total_idr'].where(combined_data['total_idr'].notna(), '=PRODUCT(H' + r + ',I' + r + ')'),
+        'rate': '=INDEX(\'Exchange Rate\'!B:B, MATCH(C' + r + ', \'Exchange Rate\'!A:A, 0))',
+        'total_usd': '=J' + r + '/K' + r
+    })
+    sales_data_2d = sales_table.to_numpy(dtype=object).tolist()
+    generate_table(sheet1, config.output_headers, sales_data_2d, "Sales_Data", sales_col_formats)
     sheet2 = wb.create_sheet('Exchange Rate')
-    # Build 2D data for exchange (Python-computed periods)
+    # Build 2D data for exchange; periods are first-of-month dates so Kurs can match Periode directly
     exchange_headers = ['Period', 'Rate']
-    exchange_data_2d = [[p, None] for p in sorted_periods]
-    exchange_col_formats = {1: '@'}
+    exchange_data_2d = [[datetime(int(p[:4]), int(p[5:]), 1), None] for p in sorted_periods]
+    exchange_col_formats = {1: 'dd/mm/yyyy'}
     generate_table(sheet2, exchange_headers, exchange_data_2d, "Exchange_Rate", exchange_col_formats)
-    # Build period_columns
-    years = sorted(set(p[:4] for p in sorted_periods))
-    period_columns = []
-    current_col = 2
-    all_month_letters = []
-    year_month_letters = defaultdict(list)
-    for year in years:
-        months_present = sorted(int(p[5:]) for p in sorted_periods if p[:4] == year)
-        for q in range(1, 5):
-            q_start = (q - 1) * 3 + 1
-            q_end = q_start + 2
-            q_months = [m for m in months_present if q_start <= m <= q_end]
-            if not q_months:
-                continue
-            q_letters = []
-            for m in q_months:
-                label = datetime(int(year), m, 1).strftime('%b %Y')
-                letter = get_column_letter(current_col)
-                period_columns.append({
-                    'label': label,
-                    'type': 'month',
-                    'periods': [f'{year}-{m:02d}'],
-                    'sum_month_cols': None
-                })
-                q_letters.append(letter)
-                all_month_letters.append(letter)
-                year_month_letters[year].append(letter)
-                current_col += 1
-            q_label = f'Q{q} {year}'
-            letter = get_column_letter(current_col)
-            period_columns.append({
-                'label': q_label,
-                'type': 'quarter',
-                'periods': [f'{year}-{mm:02d}' for mm in q_months],
-                'sum_month_cols': q_letters
-            })
-            current_col += 1
-        if months_present:
-            label = f'Total {year}'
-            letter = get_column_letter(current_col)
-            period_columns.append({
-                'label': label,
-                'type': 'year',
-                'periods': [f'{year}-{m:02d}' for m in months_present],
-                'sum_month_cols': year_month_letters[year]
-            })
-            current_col += 1
-    if sorted_periods:
-        label = 'Total'
-        letter = get_column_letter(current_col)
-        period_columns.append({
-            'label': label,
-            'type': 'grand',
-            'periods': sorted_periods,
-            'sum_month_cols': all_month_letters
-        })
-    year_to_col_letter = {}
-    for idx, pc in enumerate(period_columns):
-        if pc['type'] == 'year':
-            year = pc['label'].split()[1]
-            col_idx = idx + 2
-            year_to_col_letter[year] = get_column_letter(col_idx)
+    period_columns = build_period_structure(sorted_periods)
+    year_to_col_letter = {pc['periods'][0][:4]: pc['col_letter'] for pc in period_columns if pc['type'] == 'year'}
     for group_key in ['customer_name', 'area', 'product_name']:
         for unit in ['IDR', 'USD', 'Qty']:
             generate_group_sheet(wb, group_key, unit, combined_data, period_columns, config)
             generate_yearly_group_sheet(wb, group_key, unit, combined_data, period_columns, config, year_to_col_letter)
     # Summary
-    period_labels = []
-    current_row_idx = 0
-    all_month_row_nums = []
-    year_month_row_nums = defaultdict(list)
-    row_to_sum_rows = {}
-    for year in years:
-        months_present = sorted(int(p[5:]) for p in sorted_periods if p[:4] == year)
-        has_year = False
-        for q in range(1, 5):
-            q_start = (q - 1) * 3 + 1
-            q_end = q_start + 2
-            q_months = [m for m in months_present if q_start <= m <= q_end]
-            if not q_months:
-                continue
-            has_year = True
-            q_month_rows = []
-            for m in q_months:
-                label = datetime(int(year), m, 1).strftime('%b %Y')
-                period_labels.append(label)
-                row_num = current_row_idx + 2
-                q_month_rows.append(row_num)
-                all_month_row_nums.append(row_num)
-                year_month_row_nums[year].append(row_num)
-                current_row_idx += 1
-            q_label = f'Q{q} {year}'
-            period_labels.append(q_label)
-            q_row_num = current_row_idx + 2
-            row_to_sum_rows[q_row_num] = q_month_rows
-            current_row_idx += 1
-        if has_year:
-            y_label = f'Total {year}'
-            period_labels.append(y_label)
-            y_row_num = current_row_idx + 2
-            row_to_sum_rows[y_row_num] = year_month_row_nums[year]
-            current_row_idx += 1
-    if sorted_periods:
-        grand_label = 'Total'
-        period_labels.append(grand_label)
-        grand_row_num = current_row_idx + 2
-        row_to_sum_rows[grand_row_num] = all_month_row_nums
     sheet9 = wb.create_sheet('Summary')
     headers = ['Period', 'IDR', 'USD', 'Qty']
-    data_2d = [[label] + [''] * 3 for label in period_labels]
+    data_2d = [[pc['label']] + [''] * 3 for pc in period_columns]
     table_name = 'Summary'
     col_formats = {1: '@', 2: config.idr_format_2, 3: config.usd_format_2, 4: '#,##0'}
     row_formulas = {}
-    for r_idx in range(len(period_labels)):
-        pc = period_columns[r_idx] if r_idx < len(period_columns) else None
-        r = r_idx + 2
+    for r_idx, pc in enumerate(period_columns):
         row_formulas[r_idx] = {}
-        if pc and pc['type'] == 'month':
-            per = pc['periods'][0]
-            y, m = map(int, per.split('-'))
-            date_str = f'DATE({y},{m},1)'
+        if pc['type'] == 'month':
+            date_str = pc['date_str']
             row_formulas[r_idx][2] = f'=SUMIF(Sales_Data[Periode], {date_str}, Sales_Data[Total (IDR)])'
             row_formulas[r_idx][3] = f'=SUMIF(Sales_Data[Periode], {date_str}, Sales_Data[Total (USD)])'
             row_formulas[r_idx][4] = f'=SUMIF(Sales_Data[Periode], {date_str}, Sales_Data[Jumlah])'
         else:
-            sum_rows = row_to_sum_rows.get(r, [])
+            sum_rows = pc['sum_positions']  # Summary rows line up with the group sheets' columns
             if sum_rows:
                 sum_str_b = ','.join(f'B{sr}' for sr in sum_rows)
                 row_formulas[r_idx][2] = f'=SUM({sum_str_b})'
@@ -605,8 +627,7 @@ def process_files(file_datas):
     generate_table(sheet9, headers, data_2d, table_name, col_formats, row_formulas)
     output = io.BytesIO()
     wb.save(output)
-    output.seek(0)
-    buffer = list(output.getvalue())
+    buffer = ffi.to_js(output.getbuffer())  # Copied straight into a Uint8Array, without an interim bytes copy
     if blank_cells:
         msg = '<p>Processing complete. Warning: Please check these empty cells in the output:</p><ul>' + ''.join(f'<li>{c}</li>' for c in blank_cells) + '</ul>'
         message_type = 'warning'